@@ -0,0 +1,26 @@
+# build_surrogate_table.py
+import time
+
+from vaccination_surrogate import DEFAULT_TABLE_DIR, build_surrogate_table
+
+# ---------------------------------------------------------
+# User options
+# ---------------------------------------------------------
+OUT_DIR = DEFAULT_TABLE_DIR
+T_VALUES = range(1, 61)     # every horizon the Model page allows
+INCLUDE_SHOCKS = False      # shocks are adapted from the no-shock rows; True adds an exact row per
+                            # (start, duration) window, which is only practical for short horizons
+
+# ---------------------------------------------------------
+# Build
+# ---------------------------------------------------------
+start = time.perf_counter()
+
+
+def report(done: int, total: int) -> None:
+    print(f"  solved {done}/{total} keys ({time.perf_counter() - start:,.0f}s)")
+
+
+print(f"Building surrogate table in '{OUT_DIR}' (T={min(T_VALUES)}..{max(T_VALUES)}, shocks={INCLUDE_SHOCKS})...")
+build_surrogate_table(OUT_DIR, T_VALUES, include_shocks=INCLUDE_SHOCKS, progress=report)
+print("Done.")
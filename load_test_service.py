@@ -0,0 +1,90 @@
+# load_test_service.py
+# Start the service first:  python vaccination_service.py
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vaccination_service import DEFAULT_HOST, DEFAULT_PORT
+
+# ---------------------------------------------------------
+# User options
+# ---------------------------------------------------------
+BASE_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+CONCURRENCY = 32
+REQUESTS_PER_ENDPOINT = 500
+DISTINCT_SCENARIOS = 50      # repeats exercise the shared solve cache
+SEED = 0
+
+# ---------------------------------------------------------
+# Request mix
+# ---------------------------------------------------------
+rng = np.random.default_rng(SEED)
+
+
+def random_scenario() -> dict:
+    T = int(rng.integers(6, 25))
+    return {
+        "params": {
+            "N": int(rng.integers(100, 5_000_000)),
+            "T": T,
+            "beta": float(rng.uniform(0.0001, 1.0)),
+            "B": float(rng.uniform(0.0, 100.0)),
+            "x": 0.0002,
+            "rho": float(rng.uniform(0.01, 1.0)),
+        },
+        "shock": {
+            "enabled": True,
+            "start_t": int(rng.integers(1, T + 1)),
+            "beta_reduction_pct": float(rng.uniform()),
+            "duration": int(rng.integers(1, T + 1)),
+        },
+    }
+
+
+scenarios = [random_scenario() for _ in range(DISTINCT_SCENARIOS)]
+
+
+def simulate_payload(i: int) -> dict:
+    scenario = scenarios[i % DISTINCT_SCENARIOS]
+    T = scenario["params"]["T"]
+    return {**scenario, "f": rng.dirichlet(np.ones(T)).tolist()}
+
+
+def post(path: str, payload: dict) -> float:
+    request = urllib.request.Request(BASE_URL + path, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(path: str, payloads: list) -> None:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        latencies = np.array(list(pool.map(lambda p: post(path, p), payloads)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{path:<10} {len(payloads):>6} req  {len(payloads) / elapsed:>9,.1f} req/s  "
+          f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms")
+
+
+# ---------------------------------------------------------
+# Run
+# ---------------------------------------------------------
+print(f"Load testing {BASE_URL} with {CONCURRENCY} concurrent clients...")
+run("/simulate", [simulate_payload(i) for i in range(REQUESTS_PER_ENDPOINT)])
+run("/optimize", [scenarios[i % DISTINCT_SCENARIOS] for i in range(REQUESTS_PER_ENDPOINT)])
+run("/results", [scenarios[i % DISTINCT_SCENARIOS] for i in range(REQUESTS_PER_ENDPOINT)])
+
+with urllib.request.urlopen(BASE_URL + "/metrics") as response:
+    metrics = response.read().decode("utf-8")
+
+print("\nBatching and cache counters:")
+for line in metrics.splitlines():
+    if "batch" in line or "cache" in line:
+        print("  " + line)
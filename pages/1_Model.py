@@ -1,12 +1,10 @@
 import streamlit as st
-from vaccination_engine import (
-    optimize_budget_allocation,
-    simulate_trajectory,
-    build_results_dataframe,
-)
-from ui.model_state import init_defaults_if_missing, reset_to_defaults
+from vaccination_engine import optimize_budget_allocation
+from ui.model_state import REFINEMENT_KEY, init_defaults_if_missing, reset_to_defaults, store_latest_result
 from ui.model_inputs import render_inputs
 from ui.model_outputs import render_results
+from ui.model_surrogate import quick_answer, start_refinement, render_refinement_status
+from ui.model_scenarios import render_scenario_workspace
 
 st.set_page_config(page_title="Model", layout="wide")
 st.title("Model")
@@ -22,32 +20,23 @@ with top_left:
 params, shock, run_button = render_inputs()
 
 if run_button:
-    with st.spinner("Optimising budget allocation..."):
-        result = optimize_budget_allocation(params=params, shock=shock)
-
-    if not result.success:
-        st.error(f"Optimisation failed: {result.message}")
+    st.session_state.pop(REFINEMENT_KEY, None)
+    answer = quick_answer(params, shock)
+
+    if answer is not None:
+        # Show the precomputed answer straight away and refine it in the background
+        store_latest_result(params, shock, answer.optimal_f, answer.total_qalys,
+                            source=answer.source, error_estimate=answer.error_estimate)
+        start_refinement(params, shock)
     else:
-        optimal_f = result.x
-        omega, p_values, conversions, beta_path, shock_active = simulate_trajectory(optimal_f, params, shock)
-        total_qalys = -result.fun
-
-        df = build_results_dataframe(
-            optimal_f=optimal_f,
-            omega=omega,
-            p_values=p_values,
-            conversions=conversions,
-            beta_path=beta_path,
-            shock_active=shock_active,
-            params=params,
-        )
-
-        st.session_state["latest_df"] = df
-        st.session_state["latest_params"] = params
-        st.session_state["latest_optimal_f"] = optimal_f
-        st.session_state["latest_omega"] = omega
-        st.session_state["latest_shock_active"] = shock_active
-        st.session_state["latest_total_qalys"] = total_qalys
-        st.session_state["latest_shock_enabled"] = shock.enabled
+        with st.spinner("Optimising budget allocation..."):
+            result = optimize_budget_allocation(params=params, shock=shock)
+
+        if not result.success:
+            st.error(f"Optimisation failed: {result.message}")
+        else:
+            store_latest_result(params, shock, result.x, -result.fun)
 
+render_refinement_status()
 render_results()
+render_scenario_workspace(params, shock)
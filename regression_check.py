@@ -0,0 +1,323 @@
+# regression_check.py
+# Golden-result regression harness. Runs offline from the repo and exits non-zero on any failure.
+#   python regression_check.py            check against assets/golden/golden_results.json
+#   python regression_check.py --update   regenerate the golden file from the reference engine
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from vaccination_engine import (
+    ModelParams, ShockParams,
+    optimize_budget_allocation,
+    simulate_trajectory,
+    simulate_batch,
+    build_results_dataframe,
+)
+from vaccination_stochastic import simulate_stochastic
+from vaccination_store import TrajectoryStore, create_trajectory_store
+from vaccination_surrogate import build_surrogate_table, load_surrogate_table, surrogate_answer
+from vaccination_waning import WaningParams, optimize_waning_allocation, simulate_waning
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "golden", "golden_results.json")
+
+# ---------------------------------------------------------
+# Cases: spread over the UI input ranges
+# ---------------------------------------------------------
+CASES = {
+    "default_shock": (ModelParams(), ShockParams(enabled=True, start_t=5, beta_reduction_pct=0.6, duration=3)),
+    "default_no_shock": (ModelParams(), ShockParams(enabled=False)),
+    "single_period": (ModelParams(T=1), ShockParams(enabled=False)),
+    "long_horizon": (ModelParams(N=5_000_000, T=60, beta=0.01, B=20.0, rho=0.5), ShockParams(enabled=False)),
+    "linear_returns": (ModelParams(T=8, beta=0.2, B=2.0, rho=1.0), ShockParams(enabled=False)),
+    "strong_returns_decay": (ModelParams(T=10, beta=0.5, B=50.0, rho=0.01), ShockParams(enabled=False)),
+    "tiny_beta": (ModelParams(N=20_000, T=12, beta=0.0001, B=100.0, rho=0.3), ShockParams(enabled=False)),
+    "saturating": (ModelParams(N=500, T=6, beta=1.0, B=100.0, rho=0.8), ShockParams(enabled=False)),
+    "zero_budget": (ModelParams(T=5, B=0.0), ShockParams(enabled=False)),
+    "head_start": (ModelParams(N=10_000, T=24, vaccinated_pop_start=4_000.0, x=0.001),
+                   ShockParams(enabled=True, start_t=1, beta_reduction_pct=0.3, duration=6)),
+    "full_shock": (ModelParams(T=12, beta=0.1, B=10.0),
+                   ShockParams(enabled=True, start_t=3, beta_reduction_pct=1.0, duration=4)),
+    "shock_runs_past_T": (ModelParams(T=9, beta=0.08, B=15.0, rho=0.4),
+                          ShockParams(enabled=True, start_t=7, beta_reduction_pct=0.8, duration=10)),
+}
+
+# ---------------------------------------------------------
+# Tolerances and wall-clock budgets (seconds, best of repeats)
+# ---------------------------------------------------------
+F_ATOL = 1e-3            # SLSQP allocations may move slightly across platforms
+QALY_RTOL = 1e-6
+OMEGA_RTOL = 1e-4
+DETERMINISTIC_RTOL = 1e-10
+ENGINE_RTOL = 1e-9
+STORE_RTOL = 1e-6        # trajectories are stored as float32
+
+BUDGETS = {
+    "simulate_trajectory (T=60)": 0.002,
+    "simulate_batch (1000 x T=60)": 0.05,
+    "build_results_dataframe (T=60)": 0.02,
+    "optimize_budget_allocation (T=12)": 0.25,
+    "optimize_budget_allocation (T=60)": 5.0,
+    "surrogate_answer (T=12)": 0.005,
+    "surrogate_answer with shock (T=12)": 0.005,
+    "simulate_stochastic (10k x T=60, N=5M)": 0.25,
+    "optimize_waning_allocation (T=36, A=48)": 1.0,
+}
+
+
+def solve_case(params: ModelParams, shock: ShockParams) -> Dict:
+    result = optimize_budget_allocation(params=params, shock=shock)
+    f = result.x
+    omega, p_values, conversions, beta_path, shock_active = simulate_trajectory(f, params, shock)
+    df = build_results_dataframe(f, omega, p_values, conversions, beta_path, shock_active, params)
+    return {
+        "params": asdict(params),
+        "shock": asdict(shock),
+        "optimal_f": f.tolist(),
+        "omega": omega.tolist(),
+        "total_qalys": float(-result.fun),
+        "table": json.loads(df.to_json(orient="split", index=False, double_precision=15)),
+    }
+
+
+class Report:
+    def __init__(self):
+        self.failures: List[str] = []
+
+    def check(self, name: str, ok: bool, detail: str = "") -> None:
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}" + (f"  ({detail})" if detail else ""))
+        if not ok:
+            self.failures.append(name)
+
+    def close(self, name: str, actual, expected, rtol: float = 0.0, atol: float = 0.0) -> None:
+        actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+        ok = actual.shape == expected.shape and np.allclose(actual, expected, rtol=rtol, atol=atol)
+        err = float(np.max(np.abs(actual - expected))) if actual.shape == expected.shape else float("nan")
+        self.check(name, ok, f"max abs err {err:.3g}")
+
+
+def check_golden(report: Report, golden: Dict) -> None:
+    print("Golden outputs")
+    for name, (params, shock) in CASES.items():
+        expected = golden.get(name)
+        if expected is None:
+            report.check(f"{name}: present in golden file", False, "run with --update")
+            continue
+
+        actual = solve_case(params, shock)
+        report.close(f"{name}: optimal f", actual["optimal_f"], expected["optimal_f"], atol=F_ATOL)
+        report.close(f"{name}: total QALYs", actual["total_qalys"], expected["total_qalys"], rtol=QALY_RTOL, atol=1e-12)
+        report.close(f"{name}: omega", actual["omega"], expected["omega"], rtol=OMEGA_RTOL, atol=1e-9)
+
+        # With the allocation pinned, the simulation and table must be reproduced exactly.
+        f = np.asarray(expected["optimal_f"])
+        omega, p_values, conversions, beta_path, shock_active = simulate_trajectory(f, params, shock)
+        report.close(f"{name}: omega from golden f", omega, expected["omega"], rtol=DETERMINISTIC_RTOL)
+
+        df = build_results_dataframe(f, omega, p_values, conversions, beta_path, shock_active, params)
+        table = expected["table"]
+        same_layout = list(df.columns) == table["columns"] and len(df) == len(table["data"])
+        report.check(f"{name}: table layout", same_layout)
+        if same_layout:
+            expected_df = pd.DataFrame(table["data"], columns=table["columns"])
+            report.close(f"{name}: table values", df.to_numpy(dtype=float), expected_df.to_numpy(dtype=float),
+                         rtol=DETERMINISTIC_RTOL, atol=1e-15)
+
+
+def check_engines(report: Report, golden: Dict) -> None:
+    print("Alternative engines and solvers vs the reference loop")
+    by_T: Dict[int, List[str]] = {}
+    for name, (params, _) in CASES.items():
+        by_T.setdefault(params.T, []).append(name)
+
+    for T, names in by_T.items():
+        F = np.array([golden[n]["optimal_f"] for n in names])
+        batch = simulate_batch(F, [CASES[n][0] for n in names], [CASES[n][1] for n in names])
+        for row, name in enumerate(names):
+            reference = simulate_trajectory(F[row], *CASES[name])
+            for label, got, want in zip(("omega", "p_values", "conversions"), batch, reference):
+                report.close(f"simulate_batch {name}: {label}", got[row], want, rtol=ENGINE_RTOL, atol=1e-12)
+
+    for name, (params, shock) in CASES.items():
+        f = np.asarray(golden[name]["optimal_f"])
+        omega, *_ = simulate_trajectory(f, params, shock)
+
+        waning = simulate_waning(f, np.ones(params.T) / params.T, params, shock, WaningParams())
+        report.close(f"simulate_waning (no waning) {name}: omega", waning.omega, omega, rtol=ENGINE_RTOL, atol=1e-9)
+
+        replicates = 4000
+        stochastic = simulate_stochastic(f, params, shock, replicates=replicates, seed=0)
+        mean, sd = stochastic.omega.mean(axis=0), stochastic.omega.std(axis=0)
+        # Integer start stock: the expectation equals the deterministic path (6 standard errors + rounding).
+        allowed = 6.0 * sd / np.sqrt(replicates) + 1.0
+        shifted = omega - params.vaccinated_pop_start + round(params.vaccinated_pop_start)
+        report.check(f"simulate_stochastic {name}: mean omega", bool(np.all(np.abs(mean - shifted) <= allowed)))
+
+        result = optimize_waning_allocation(params, shock, WaningParams())
+        gap = (golden[name]["total_qalys"] + result.fun) / max(golden[name]["total_qalys"], 1e-12)
+        report.check(f"optimize_waning_allocation (no waning) {name}: QALYs", gap <= 1e-4, f"relative shortfall {gap:.2e}")
+
+    # Tabulate every case horizon (no-shock rows only, as the default build does).
+    with tempfile.TemporaryDirectory() as table_dir:
+        build_surrogate_table(table_dir, sorted(by_T), include_shocks=False)
+        table = load_surrogate_table(table_dir)
+        for name, (params, shock) in CASES.items():
+            answer = surrogate_answer(table, params, shock)
+            report.check(f"surrogate_answer {name}: covered", answer is not None, f"T={params.T}")
+            if answer is None:
+                continue
+            gap = (golden[name]["total_qalys"] - answer.total_qalys) / max(golden[name]["total_qalys"], 1e-12)
+            report.check(f"surrogate_answer {name}: QALYs", gap <= max(answer.error_estimate, 1e-6),
+                         f"shortfall {gap:.2e}, bound {answer.error_estimate:.2e}")
+
+
+def check_store(report: Report, golden: Dict) -> None:
+    print("Trajectory store round trip")
+    with tempfile.TemporaryDirectory() as store_dir:
+        # A tiny initial capacity makes the appends below grow the columns several times.
+        writer = create_trajectory_store(store_dir, T_max=60, capacity=2)
+        reader = TrajectoryStore(store_dir)
+        expected = []
+
+        for name, (params, shock) in CASES.items():
+            f = np.asarray(golden[name]["optimal_f"])
+            trajectory = simulate_trajectory(f, params, shock)
+            writer.append(params, shock, f, *trajectory)
+            expected.append((name, params, shock, f, trajectory))
+
+        # Growth rewrites the metadata, but only flush() may publish rows.
+        reader.refresh()
+        report.check("store: unflushed rows stay hidden while growing", len(reader) == 0,
+                     f"{len(reader)} visible, 0 flushed, capacity {reader.capacity}")
+        writer.flush()
+        flushed = len(writer)
+
+        by_T: Dict[int, List[str]] = {}
+        for name, (params, _) in CASES.items():
+            by_T.setdefault(params.T, []).append(name)
+        for T, names in by_T.items():
+            F = np.array([golden[n]["optimal_f"] for n in names])
+            params_list, shocks = [CASES[n][0] for n in names], [CASES[n][1] for n in names]
+            writer.append_batch(params_list, shocks, F, *simulate_batch(F, params_list, shocks))
+            for row, name in enumerate(names):
+                expected.append((f"{name} (batch)", *CASES[name], F[row], simulate_trajectory(F[row], *CASES[name])))
+
+        reader.refresh()
+        report.check("store: readers see exactly the flushed rows", len(reader) == flushed,
+                     f"{len(reader)} visible, {flushed} flushed, {len(writer)} appended")
+        writer.flush()
+        reader.refresh()
+        report.check("store: flush publishes every row", len(reader) == len(expected),
+                     f"{len(reader)} visible of {len(expected)}, capacity {reader.capacity}")
+
+        store = TrajectoryStore(store_dir)
+        report.check("store: grew past the initial capacity", store.capacity >= len(expected) > 2,
+                     f"capacity {store.capacity}")
+        _, params, shock, f, trajectory = expected[0]
+        try:
+            store.append(params, shock, f, *trajectory)
+            report.check("store: read-only append rejected", False)
+        except ValueError:
+            report.check("store: read-only append rejected", True)
+
+        for i, (name, params, shock, f, trajectory) in enumerate(expected):
+            report.check(f"store {name}: parameters", store.scenario_params(i) == (params, shock))
+            views = store.scenario(i)
+            report.check(f"store {name}: shock_active bits", np.array_equal(views["shock_active"], trajectory[4]))
+            report.check(f"store {name}: zero-copy views",
+                         all(np.shares_memory(views[c], store.columns[c]) for c in ("optimal_f", "omega")))
+
+            df = store.results_dataframe(i)
+            want = build_results_dataframe(f, *trajectory, params)
+            same_layout = list(df.columns) == list(want.columns) and len(df) == len(want)
+            report.check(f"store {name}: table layout", same_layout)
+            if same_layout:
+                report.close(f"store {name}: table values", df.to_numpy(dtype=float), want.to_numpy(dtype=float),
+                             rtol=STORE_RTOL, atol=1e-9)
+
+
+def best_time(fn: Callable[[], object], repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_budgets(report: Report) -> None:
+    print("Wall-clock budgets")
+    long_params = ModelParams(N=5_000_000, T=60, beta=0.01, B=20.0, rho=0.5)
+    shock = ShockParams(enabled=True, start_t=5, beta_reduction_pct=0.6, duration=3)
+    f60 = np.ones(60) / 60
+    trajectory = simulate_trajectory(f60, long_params, shock)
+
+    with tempfile.TemporaryDirectory() as table_dir:
+        build_surrogate_table(table_dir, [12], include_shocks=False, rho_grid=np.linspace(0.01, 1.0, 3),
+                              k_grid=np.geomspace(1e-4, 100.0, 3))
+        table = load_surrogate_table(table_dir)
+        no_shock = ShockParams(enabled=False)
+        # A key miss returns None at once, so make sure the timed calls take the full path.
+        for label, timed_shock in (("no shock", no_shock), ("shock", shock)):
+            report.check(f"surrogate_answer (T=12, {label}): table covers the timed case",
+                         surrogate_answer(table, ModelParams(), timed_shock) is not None)
+
+        runs = {
+            "simulate_trajectory (T=60)": lambda: simulate_trajectory(f60, long_params, shock),
+            "simulate_batch (1000 x T=60)": lambda: simulate_batch(np.tile(f60, (1000, 1)), [long_params] * 1000,
+                                                                   [shock] * 1000),
+            "build_results_dataframe (T=60)": lambda: build_results_dataframe(f60, *trajectory, long_params),
+            "optimize_budget_allocation (T=12)": lambda: optimize_budget_allocation(ModelParams(), shock),
+            "optimize_budget_allocation (T=60)": lambda: optimize_budget_allocation(long_params, shock),
+            "surrogate_answer (T=12)": lambda: surrogate_answer(table, ModelParams(), no_shock),
+            "surrogate_answer with shock (T=12)": lambda: surrogate_answer(table, ModelParams(), shock),
+            "simulate_stochastic (10k x T=60, N=5M)": lambda: simulate_stochastic(f60, long_params, shock,
+                                                                                  replicates=10_000, seed=0),
+            "optimize_waning_allocation (T=36, A=48)": lambda: optimize_waning_allocation(
+                ModelParams(T=36), shock, WaningParams(waning_rate=0.1, booster_B=3.0, n_ages=48)),
+        }
+
+        for name, budget in BUDGETS.items():
+            repeats = 1 if budget >= 1.0 else 5
+            elapsed = best_time(runs[name], repeats)
+            report.check(f"{name}", elapsed <= budget, f"{elapsed * 1000:.2f} ms, budget {budget * 1000:.0f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Golden-result regression harness")
+    parser.add_argument("--update", action="store_true", help="regenerate the golden file")
+    args = parser.parse_args()
+
+    if args.update:
+        golden = {name: solve_case(params, shock) for name, (params, shock) in CASES.items()}
+        os.makedirs(os.path.dirname(GOLDEN_FILE), exist_ok=True)
+        with open(GOLDEN_FILE, "w", encoding="utf-8") as fh:
+            json.dump(golden, fh, indent=1)
+        print(f"Wrote {len(golden)} golden cases to '{GOLDEN_FILE}'")
+        return 0
+
+    with open(GOLDEN_FILE, encoding="utf-8") as fh:
+        golden = json.load(fh)
+
+    report = Report()
+    check_golden(report, golden)
+    if not report.failures:
+        check_engines(report, golden)
+        check_store(report, golden)
+    check_budgets(report)
+
+    print(f"\n{len(report.failures)} failure(s)")
+    for name in report.failures:
+        print(f"  - {name}")
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,6 +56,15 @@ def render_inputs() -> tuple[ModelParams, ShockParams, bool]:
             shock_duration = 0
             st.info("Shock is disabled. Shock parameters will be ignored.")
 
+        st.markdown("## Stochastic uptake")
+
+        st.checkbox("Show stochastic uptake bands (binomial draws of whole people)",
+                    value=bool(st.session_state["stochastic_enabled"]), key="stochastic_enabled")
+        st.number_input("Replicate runs", min_value=10, max_value=100_000,
+                        value=int(st.session_state["stochastic_replicates"]), step=100, key="stochastic_replicates")
+        st.number_input("Random seed", min_value=0, max_value=2**31 - 1,
+                        value=int(st.session_state["stochastic_seed"]), step=1, key="stochastic_seed")
+
         run_button = st.form_submit_button("🚀 Calculate results", use_container_width=True)
 
     params = ModelParams(
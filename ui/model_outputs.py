@@ -3,7 +3,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
 
-def make_plot(params, optimal_f, omega, shock_active, shock_enabled):
+def make_plot(params, optimal_f, omega, shock_active, shock_enabled, omega_bands=None):
     fig, ax1 = plt.subplots(figsize=(10, 5))
 
     ax1.set_xlabel("Time period (t)")
@@ -17,6 +17,11 @@ def make_plot(params, optimal_f, omega, shock_active, shock_enabled):
     ax2.set_ylabel("Total vaccinated (stock at start of t)")
     ax2.plot(range(1, params.T + 1), omega[0:params.T], marker="o", linewidth=2)
 
+    # outermost stochastic percentiles (P5-P95 by default)
+    if omega_bands is not None:
+        ax2.fill_between(range(1, params.T + 1), omega_bands[0][0:params.T], omega_bands[-1][0:params.T],
+                         alpha=0.2, linewidth=0)
+
     if shock_enabled:
         for t in range(params.T):
             if shock_active[t]:
@@ -54,6 +59,13 @@ def render_results():
     shock_active = st.session_state["latest_shock_active"]
     total_qalys = st.session_state["latest_total_qalys"]
     shock_enabled = st.session_state["latest_shock_enabled"]
+    omega_bands = st.session_state.get("latest_omega_bands")
+
+    if st.session_state.get("latest_source") == "surrogate":
+        st.caption(
+            "Surrogate answer from the precomputed table: QALYs gained are within "
+            f"{st.session_state['latest_error_estimate']:.2%} of the optimum."
+        )
 
     colA, colB = st.columns([1, 1])
 
@@ -69,7 +81,7 @@ def render_results():
 
     with colB:
         st.markdown("### Plot")
-        fig = make_plot(params, optimal_f, omega, shock_active, shock_enabled)
+        fig = make_plot(params, optimal_f, omega, shock_active, shock_enabled, omega_bands)
 
         # Generate PNG bytes BEFORE Streamlit clears anything
         png_bytes = fig_to_png_bytes(fig)
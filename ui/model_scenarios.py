@@ -0,0 +1,317 @@
+import dataclasses
+import io
+import itertools
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+
+from vaccination_engine import optimize_budget_allocation, simulate_trajectory
+from ui.model_state import MAX_SCENARIOS, SCENARIOS_KEY, SCENARIOS_VERSION_KEY, SCENARIOS_PLOT_KEY
+
+# Grid parameters: label -> (dataclass, field, cast, min, max), using the Model page input ranges.
+# Shock start and duration are further capped at each variant's T, as on the page.
+GRID_PARAMETERS = {
+    "Responsiveness (beta)": ("params", "beta", float, 0.0001, 1.0),
+    "Budget per capita (B)": ("params", "B", float, 0.0, 100.0),
+    "Returns to scale (rho)": ("params", "rho", float, 0.01, 1.0),
+    "QALY multiplier (x)": ("params", "x", float, 0.0, 0.01),
+    "Population (N)": ("params", "N", int, 1, 5_000_000),
+    "Time horizon (T)": ("params", "T", int, 1, 60),
+    "Shock strength": ("shock", "beta_reduction_pct", float, 0.0, 1.0),
+    "Shock start period": ("shock", "start_t", int, 1, 60),
+    "Shock duration": ("shock", "duration", int, 1, 60),
+}
+
+LEGEND_LIMIT = 12
+
+
+def _workspace() -> OrderedDict:
+    if SCENARIOS_KEY not in st.session_state:
+        st.session_state[SCENARIOS_KEY] = OrderedDict()
+        st.session_state[SCENARIOS_VERSION_KEY] = 0
+    return st.session_state[SCENARIOS_KEY]
+
+
+def _touch():
+    st.session_state[SCENARIOS_VERSION_KEY] += 1
+
+
+def scenario_label(params, shock) -> str:
+    label = (f"β={params.beta:g}, B={params.B:g}, ρ={params.rho:g}, x={params.x:g}, "
+             f"T={params.T}, N={params.N:,}")
+    if params.vaccinated_pop_start > 0:
+        label += f", {params.vaccinated_pop_start:,.0f} vaccinated at start"
+    if shock.enabled and shock.duration > 0:
+        label += f", shock {shock.beta_reduction_pct:.0%} t{shock.start_t}+{shock.duration}"
+    return label
+
+
+def _unique_label(workspace, key, label):
+    # Rounded values can still collide (e.g. shock 60% vs 60.4%); the baseline picker needs distinct names.
+    taken = {s["label"] for k, s in workspace.items() if k != key}
+    n = 2
+    unique = label
+    while unique in taken:
+        unique = f"{label} #{n}"
+        n += 1
+    return unique
+
+
+def add_scenario(params, shock, optimal_f, total_qalys):
+    """Stores a solved scenario (keyed by its inputs) in the bounded session workspace."""
+    workspace = _workspace()
+    omega, *_ = simulate_trajectory(optimal_f, params, shock)
+
+    key = (params, shock)
+    workspace.pop(key, None)
+    workspace[key] = {
+        "label": _unique_label(workspace, key, scenario_label(params, shock)),
+        "params": params,
+        "shock": shock,
+        "optimal_f": np.asarray(optimal_f, dtype=np.float32),
+        "omega": np.asarray(omega, dtype=np.float32),
+        "total_qalys": float(total_qalys),
+    }
+    while len(workspace) > MAX_SCENARIOS:
+        workspace.popitem(last=False)
+    _touch()
+
+
+@st.cache_resource
+def _solver_pool():
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _grid_value(label, text):
+    """Parses one grid value, raising ValueError if it is outside the Model page range."""
+    _, _, cast, low, high = GRID_PARAMETERS[label]
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"{label}: {text!r} is not a number") from None
+    if cast is int and not value.is_integer():
+        raise ValueError(f"{label} must be a whole number, got {text}")
+    if not low <= value <= high:
+        raise ValueError(f"{label} must be between {low:g} and {high:g}, got {text}")
+    return cast(value)
+
+
+def _check_variant(params, shock):
+    if params.vaccinated_pop_start > params.N:
+        raise ValueError(f"Population (N) = {params.N:,} is below the initial number vaccinated "
+                         f"({params.vaccinated_pop_start:,.0f})")
+    if shock.enabled and shock.duration > 0:
+        if shock.start_t > params.T or shock.duration > params.T:
+            raise ValueError(f"Shock start period and duration must not exceed T = {params.T} "
+                             f"(got start {shock.start_t}, duration {shock.duration})")
+
+
+def _restart_solver_pool():
+    # A dead worker leaves the cached pool unusable, so drop it and let the next grid rebuild it.
+    _solver_pool.clear()
+    st.error("A solver worker stopped unexpectedly, so the worker pool has been restarted. "
+             "Solve the grid again to retry the missing scenarios.")
+
+
+def grid_variants(params, shock, axes, idle_shock=None):
+    """
+    Cartesian product of (grid label, values) axes applied to the current inputs.
+    Variants that change a shock field are enabled and, while the current shock is off,
+    start from `idle_shock` (the page's hidden shock settings) rather than the zero-length
+    placeholder. Raises ValueError if a value, or a combination, is outside the Model page
+    input ranges.
+    """
+    parsed = [[_grid_value(label, value) for value in values] for label, values in axes]
+    variants = []
+    for combo in itertools.product(*parsed):
+        changes = {"params": {}, "shock": {}}
+        for (label, _), value in zip(axes, combo):
+            target, field, *_ = GRID_PARAMETERS[label]
+            changes[target][field] = value
+        variant_shock = shock
+        if changes["shock"]:
+            base = shock if shock.enabled or idle_shock is None else idle_shock
+            variant_shock = dataclasses.replace(base, enabled=True, **changes["shock"])
+        variant_params = dataclasses.replace(params, **changes["params"])
+        _check_variant(variant_params, variant_shock)
+        variants.append((variant_params, variant_shock))
+    return variants
+
+
+def solve_variants(variants):
+    """Solves variants concurrently in worker processes, skipping ones already in the workspace."""
+    workspace = _workspace()
+    pending = [v for v in dict.fromkeys(variants) if v not in workspace]
+    failed = 0
+
+    try:
+        futures = {_solver_pool().submit(optimize_budget_allocation, p, s): (p, s) for p, s in pending}
+    except BrokenProcessPool:
+        _restart_solver_pool()
+        return
+
+    broken = False
+    progress = st.progress(0.0, text=f"Solving {len(pending)} scenarios...")
+    for done, future in enumerate(as_completed(futures), start=1):
+        params, shock = futures[future]
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            broken = True
+            result = None
+        except Exception:
+            result = None
+        if result is not None and result.success and np.isfinite(result.fun):
+            add_scenario(params, shock, result.x, -result.fun)
+        else:
+            failed += 1
+        progress.progress(done / len(pending), text=f"Solved {done}/{len(pending)} scenarios")
+    progress.empty()
+
+    if broken:
+        _restart_solver_pool()
+    if failed:
+        st.warning(f"{failed} scenario(s) failed to optimise and were not added.")
+
+
+def make_overlay_plot(scenarios, baseline_key):
+    """
+    Overlays every scenario's allocation and vaccinated stock. Each axis draws one
+    LineCollection, so cost stays flat as the number of scenarios grows.
+    """
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5))
+    colors = plt.cm.viridis(np.linspace(0.0, 0.9, len(scenarios)))
+
+    f_lines, omega_lines = [], []
+    for s in scenarios.values():
+        t = np.arange(1, s["params"].T + 1)
+        f_lines.append(np.column_stack([t, s["optimal_f"]]))
+        omega_lines.append(np.column_stack([t, s["omega"][0:s["params"].T]]))
+
+    for ax, lines in ((ax1, f_lines), (ax2, omega_lines)):
+        ax.add_collection(LineCollection(lines, colors=colors, linewidths=1.2, alpha=0.75))
+        ax.autoscale()
+        ax.grid(True, alpha=0.3)
+        ax.set_xlabel("Time period (t)")
+
+    baseline = scenarios.get(baseline_key)
+    if baseline is not None:
+        t = np.arange(1, baseline["params"].T + 1)
+        ax1.plot(t, baseline["optimal_f"], color="black", linewidth=2.5)
+        ax2.plot(t, baseline["omega"][0:baseline["params"].T], color="black", linewidth=2.5)
+
+    ax1.set_ylabel("Budget share ($f_t$)")
+    ax2.set_ylabel("Total vaccinated (stock at start of t)")
+    ax1.set_title("Allocations")
+    ax2.set_title("Vaccinated stock")
+
+    fig.tight_layout()
+    if len(scenarios) <= LEGEND_LIMIT:
+        handles = [Line2D([], [], color=c) for c in colors]
+        fig.legend(handles, [s["label"] for s in scenarios.values()], loc="upper center",
+                   bbox_to_anchor=(0.5, 0.0), ncol=2, fontsize="small")
+    return fig
+
+
+def build_diff_table(scenarios, baseline_key) -> pd.DataFrame:
+    base_qalys = scenarios[baseline_key]["total_qalys"] if baseline_key in scenarios else np.nan
+
+    rows = []
+    for key, s in scenarios.items():
+        params, shock = s["params"], s["shock"]
+        spend = params.N * params.B
+        rows.append({
+            "Scenario": s["label"],
+            "Baseline": key == baseline_key,
+            "Total QALYs": s["total_qalys"],
+            "Δ QALYs vs baseline": s["total_qalys"] - base_qalys,
+            "Δ % vs baseline": 100.0 * (s["total_qalys"] / base_qalys - 1.0) if base_qalys else np.nan,
+            "Cost per QALY (£/QALY)": spend / s["total_qalys"] if s["total_qalys"] > 0 else np.nan,
+            "Peak spend period": int(np.argmax(s["optimal_f"])) + 1,
+            "Final vaccinated share": float(s["omega"][params.T]) / params.N,
+            "Shock active": bool(shock.enabled and shock.duration > 0),
+        })
+    return pd.DataFrame(rows)
+
+
+def _parse_values(text):
+    return [v.strip() for v in text.split(",") if v.strip()]
+
+
+def render_scenario_workspace(params, shock):
+    """What-if workspace: saved scenarios, grid batch-add, overlay plot and diff table."""
+    st.divider()
+    st.subheader("Scenario comparison")
+
+    workspace = _workspace()
+
+    col_add, col_clear = st.columns([1, 1])
+    with col_add:
+        if st.button("➕ Add latest result to comparison", use_container_width=True,
+                     disabled="latest_optimal_f" not in st.session_state):
+            add_scenario(st.session_state["latest_params"], st.session_state["latest_shock"],
+                         st.session_state["latest_optimal_f"], st.session_state["latest_total_qalys"])
+    with col_clear:
+        if st.button("🗑️ Clear comparison", use_container_width=True, disabled=not workspace):
+            workspace.clear()
+            _touch()
+
+    with st.expander("Batch-add a grid of variants of the current inputs"):
+        with st.form("scenario_grid_form"):
+            labels = list(GRID_PARAMETERS)
+            first = st.selectbox("Vary", labels, index=0)
+            first_values = st.text_input("Values (comma separated)", "0.01, 0.02, 0.05, 0.1, 0.2")
+            second = st.selectbox("And vary (optional)", ["(none)"] + labels, index=0)
+            second_values = st.text_input("Values (comma separated)", "", key="scenario_grid_second_values")
+            submitted = st.form_submit_button("Solve grid", use_container_width=True)
+
+        if submitted:
+            axes = [(first, _parse_values(first_values))]
+            if second != "(none)" and second != first:
+                axes.append((second, _parse_values(second_values)))
+            # Clamped to T the same way render_inputs clamps the widgets when the shock is on.
+            idle_shock = dataclasses.replace(
+                shock,
+                start_t=min(int(st.session_state["shock_start_t"]), params.T),
+                beta_reduction_pct=float(st.session_state["shock_beta_reduction_pct"]),
+                duration=min(int(st.session_state["shock_duration"]), params.T),
+            )
+            try:
+                variants = grid_variants(params, shock, axes, idle_shock)
+            except ValueError as exc:
+                st.error(f"Invalid grid: {exc}")
+                variants = []
+            if len(variants) > MAX_SCENARIOS:
+                st.error(f"The grid has {len(variants)} scenarios; the workspace holds at most {MAX_SCENARIOS}.")
+            elif variants:
+                solve_variants(variants)
+
+    st.caption(f"{len(workspace)} of up to {MAX_SCENARIOS} scenarios stored. "
+               "Comparisons are drawn from stored results without re-optimising.")
+    if not workspace:
+        return
+
+    keys = list(workspace)
+    baseline_key = st.selectbox("Baseline scenario", keys, format_func=lambda k: workspace[k]["label"])
+
+    # The figure only depends on the stored arrays and the baseline, so reuse it across reruns.
+    plot_key = (st.session_state[SCENARIOS_VERSION_KEY], baseline_key)
+    cached = st.session_state.get(SCENARIOS_PLOT_KEY)
+    if cached is None or cached[0] != plot_key:
+        fig = make_overlay_plot(workspace, baseline_key)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=110, bbox_inches="tight")   # screen resolution keeps reruns fast
+        plt.close(fig)
+        cached = (plot_key, buf.getvalue())
+        st.session_state[SCENARIOS_PLOT_KEY] = cached
+    st.image(cached[1], use_container_width=True)
+
+    st.dataframe(build_diff_table(workspace, baseline_key), use_container_width=True, hide_index=True)
@@ -1,4 +1,6 @@
 import streamlit as st
+from vaccination_engine import simulate_trajectory, build_results_dataframe
+from vaccination_stochastic import simulate_stochastic, omega_percentiles, add_omega_bands
 
 DEFAULTS = {
     "N": 1000,
@@ -12,6 +14,9 @@ DEFAULTS = {
     "shock_start_t": 5,
     "shock_beta_reduction_pct": 0.6,
     "shock_duration": 3,
+    "stochastic_enabled": False,
+    "stochastic_replicates": 1000,
+    "stochastic_seed": 0,
 }
 
 LATEST_KEYS = [
@@ -22,8 +27,20 @@ LATEST_KEYS = [
     "latest_shock_active",
     "latest_total_qalys",
     "latest_shock_enabled",
+    "latest_source",
+    "latest_error_estimate",
+    "latest_omega_bands",
+    "latest_shock",
 ]
 
+REFINEMENT_KEY = "pending_refinement"
+REFINEMENT_NOTICE_KEY = "refinement_notice"
+
+MAX_SCENARIOS = 100
+SCENARIOS_KEY = "scenario_workspace"
+SCENARIOS_VERSION_KEY = "scenario_workspace_version"
+SCENARIOS_PLOT_KEY = "scenario_workspace_plot"
+
 def init_defaults_if_missing():
     # Only fill in missing keys; never overwrite user-changed values
     for k, v in DEFAULTS.items():
@@ -37,4 +54,42 @@ def reset_to_defaults(clear_results: bool = True):
     if clear_results:
         for k in LATEST_KEYS:
             st.session_state.pop(k, None)
+        st.session_state.pop(REFINEMENT_KEY, None)
+        st.session_state.pop(REFINEMENT_NOTICE_KEY, None)
+        for k in (SCENARIOS_KEY, SCENARIOS_VERSION_KEY, SCENARIOS_PLOT_KEY):
+            st.session_state.pop(k, None)
     st.rerun()
+
+def store_latest_result(params, shock, optimal_f, total_qalys, source="solve", error_estimate=0.0):
+    """Simulates the allocation and stores it as the latest result."""
+    omega, p_values, conversions, beta_path, shock_active = simulate_trajectory(optimal_f, params, shock)
+
+    df = build_results_dataframe(
+        optimal_f=optimal_f,
+        omega=omega,
+        p_values=p_values,
+        conversions=conversions,
+        beta_path=beta_path,
+        shock_active=shock_active,
+        params=params,
+    )
+
+    omega_bands = None
+    if st.session_state.get("stochastic_enabled"):
+        stochastic = simulate_stochastic(optimal_f, params, shock,
+                                         replicates=int(st.session_state["stochastic_replicates"]),
+                                         seed=int(st.session_state["stochastic_seed"]))
+        omega_bands = omega_percentiles(stochastic.omega)
+        df = add_omega_bands(df, omega_bands)
+
+    st.session_state["latest_df"] = df
+    st.session_state["latest_params"] = params
+    st.session_state["latest_optimal_f"] = optimal_f
+    st.session_state["latest_omega"] = omega
+    st.session_state["latest_shock_active"] = shock_active
+    st.session_state["latest_total_qalys"] = total_qalys
+    st.session_state["latest_shock_enabled"] = shock.enabled
+    st.session_state["latest_shock"] = shock
+    st.session_state["latest_source"] = source
+    st.session_state["latest_error_estimate"] = error_estimate
+    st.session_state["latest_omega_bands"] = omega_bands
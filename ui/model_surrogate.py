@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from vaccination_surrogate import (
+    DEFAULT_TOLERANCE,
+    load_surrogate_table,
+    solve_exact,
+    surrogate_answer,
+)
+from ui.model_state import REFINEMENT_KEY, REFINEMENT_NOTICE_KEY, store_latest_result
+
+
+@st.cache_resource
+def get_surrogate_table():
+    """Loads the prebuilt table once per server (None if build_surrogate_table.py has not been run)."""
+    return load_surrogate_table()
+
+
+@st.cache_resource
+def _refinement_executor():
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def quick_answer(params, shock):
+    """Returns the surrogate answer if it is within tolerance, else None."""
+    table = get_surrogate_table()
+    if table is None:
+        return None
+    answer = surrogate_answer(table, params, shock)
+    if answer is None or answer.error_estimate > DEFAULT_TOLERANCE:
+        return None
+    return answer
+
+
+def start_refinement(params, shock):
+    """Runs the full optimisation in the background for the latest surrogate answer."""
+    future = _refinement_executor().submit(solve_exact, params, shock)
+    st.session_state[REFINEMENT_KEY] = (future, params, shock)
+
+
+def render_refinement_status():
+    """Shows the refinement status, polling only while a background optimisation is pending."""
+    notice = st.session_state.pop(REFINEMENT_NOTICE_KEY, None)
+    if notice is not None:
+        st.toast(notice)
+    if st.session_state.get(REFINEMENT_KEY) is not None:
+        _poll_refinement()
+
+
+@st.fragment(run_every=1.0)
+def _poll_refinement():
+    """Polls the background optimisation and swaps in its result when it finishes."""
+    pending = st.session_state.get(REFINEMENT_KEY)
+    if pending is None:
+        return
+
+    future, params, shock = pending
+    if not future.done():
+        st.info("Showing the instant surrogate answer. Refining with a full optimisation...")
+        return
+
+    # Either way, finish with a full rerun so the fragment is no longer rendered and stops polling.
+    st.session_state.pop(REFINEMENT_KEY, None)
+    try:
+        answer = future.result()
+    except Exception as exc:
+        st.session_state[REFINEMENT_NOTICE_KEY] = f"Refinement failed ({exc}). Keeping the surrogate answer."
+        st.rerun()
+
+    # The surrogate can occasionally beat SLSQP; keep whichever allocation is better.
+    if answer.total_qalys >= st.session_state["latest_total_qalys"]:
+        store_latest_result(params, shock, answer.optimal_f, answer.total_qalys, source=answer.source)
+    st.rerun()
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
@@ -96,6 +96,46 @@ def simulate_trajectory(
     return omega, p_values, conversions, beta_path, shock_active
 
 
+def simulate_batch(
+    F: np.ndarray,
+    params_list: Sequence[ModelParams],
+    shocks: Optional[Sequence[Optional[ShockParams]]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorised simulate_trajectory for a batch of scenarios sharing the same T.
+    Row i of every output matches simulate_trajectory(F[i], params_list[i], shocks[i])
+    up to floating-point rounding.
+
+    Returns:
+        omega: (batch, T+1), p_values, conversions, beta_path, shock_active: (batch, T)
+    """
+    T = params_list[0].T
+    if any(p.T != T for p in params_list):
+        raise ValueError("simulate_batch requires every scenario to have the same T")
+
+    shocks = shocks or [None] * len(params_list)
+    paths = [build_beta_path(p, s or ShockParams(enabled=False)) for p, s in zip(params_list, shocks)]
+    beta_path = np.array([path for path, _ in paths]).reshape(len(params_list), T)
+    shock_active = np.array([active for _, active in paths], dtype=bool).reshape(len(params_list), T)
+
+    N = np.array([p.N for p in params_list], dtype=float)
+    B = np.array([p.B for p in params_list], dtype=float)[:, None]
+    rho = np.array([p.rho for p in params_list], dtype=float)[:, None]
+
+    spend = B * np.maximum(np.asarray(F, dtype=float), 0.0)
+    p_values = 1.0 - np.exp(-beta_path * spend ** rho)
+
+    omega = np.zeros((len(params_list), T + 1))
+    omega[:, 0] = [p.vaccinated_pop_start for p in params_list]
+    conversions = np.zeros((len(params_list), T))
+
+    for t in range(T):
+        conversions[:, t] = p_values[:, t] * (N - omega[:, t])
+        omega[:, t + 1] = omega[:, t] + conversions[:, t]
+
+    return omega, p_values, conversions, beta_path, shock_active
+
+
 def objective(f: np.ndarray, params: ModelParams, shock: Optional[ShockParams] = None) -> float:
     """
     Objective for minimizer: negative total QALYs.
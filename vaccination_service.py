@@ -0,0 +1,437 @@
+# vaccination_service.py
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vaccination_engine import (
+    ModelParams, ShockParams,
+    optimize_budget_allocation,
+    simulate_batch,
+    simulate_trajectory,
+    build_results_dataframe,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WINDOW = 0.005          # seconds to wait for more requests before evaluating a batch
+DEFAULT_MAX_BATCH = 256
+DEFAULT_CACHE_SIZE = 4096
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SolveKey = Tuple[ModelParams, ShockParams]
+
+
+class RequestError(ValueError):
+    """Raised for malformed requests; reported to the client as HTTP 400."""
+
+
+# Field -> (type, min, max), matching the input ranges on the Model page (ui/model_inputs.py).
+PARAM_FIELDS = {
+    "N": (int, 1, 5_000_000),
+    "T": (int, 1, 60),
+    "beta": (float, 0.0001, 1.0),
+    "B": (float, 0.0, 100.0),
+    "vaccinated_pop_start": (float, 0.0, 5_000_000),
+    "x": (float, 0.0, 0.01),
+    "rho": (float, 0.01, 1.0),
+}
+SHOCK_FIELDS = {
+    "enabled": (bool, None, None),
+    "start_t": (int, 1, 60),
+    "beta_reduction_pct": (float, 0.0, 1.0),
+    "duration": (int, 0, 60),
+}
+
+TYPE_NAMES = {bool: "a boolean", int: "an integer", float: "a number"}
+
+
+def _parse_fields(obj: Any, fields: Dict[str, Tuple[type, Any, Any]], section: str) -> Dict[str, Any]:
+    if not isinstance(obj, dict):
+        raise RequestError(f'"{section}" must be a JSON object')
+    unknown = set(obj) - set(fields)
+    if unknown:
+        raise RequestError(f'unknown {section} field(s): {", ".join(sorted(unknown))}')
+
+    values = {}
+    for name, value in obj.items():
+        kind, low, high = fields[name]
+        if kind is bool:
+            ok = isinstance(value, bool)
+        elif kind is int:
+            ok = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+        if not ok:
+            raise RequestError(f"{section}.{name} must be {TYPE_NAMES[kind]}")
+        if low is not None and not low <= value <= high:
+            raise RequestError(f"{section}.{name} must be between {low} and {high}")
+        values[name] = kind(value)
+    return values
+
+
+def parse_scenario(payload: Dict[str, Any]) -> SolveKey:
+    """
+    Builds (ModelParams, ShockParams) from the "params" and "shock" objects of a request.
+    Raises RequestError for unknown fields, wrong types or out-of-range values.
+    """
+    params = ModelParams(**_parse_fields(payload.get("params", {}), PARAM_FIELDS, "params"))
+    shock = ShockParams(**_parse_fields(payload.get("shock", {}), SHOCK_FIELDS, "shock"))
+    if params.vaccinated_pop_start > params.N:
+        raise RequestError("params.vaccinated_pop_start must not exceed N")
+    return params, shock
+
+
+def parse_allocation(payload: Dict[str, Any], T: int) -> np.ndarray:
+    try:
+        f = np.asarray(payload.get("f", []), dtype=float)
+    except (TypeError, ValueError) as exc:
+        raise RequestError("f must be a list of numbers") from exc
+    if f.shape != (T,):
+        raise RequestError(f"f must be a list of length T={T}")
+    if not np.all(np.isfinite(f)):
+        raise RequestError("f must contain only finite numbers")
+    return f
+
+
+def _solve(params: ModelParams, shock: ShockParams) -> Dict[str, Any]:
+    """Worker-process entry point; returns only picklable, JSON-ready values."""
+    result = optimize_budget_allocation(params=params, shock=shock)
+    return {
+        "f": result.x.tolist(),
+        "total_qalys": float(-result.fun),
+        "success": bool(result.success),
+        "message": str(result.message),
+    }
+
+
+class Metrics:
+    """Thread-safe request counters and latency histograms in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._requests: Dict[Tuple[str, int], int] = defaultdict(int)
+        self._latency_sum: Dict[str, float] = defaultdict(float)
+        self._latency_buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self._counters: Dict[str, float] = defaultdict(float)
+
+    def observe(self, endpoint: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self._requests[(endpoint, status)] += 1
+            self._latency_sum[endpoint] += seconds
+            buckets = self._latency_buckets[endpoint]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+
+    def inc(self, name: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [f"vaccination_uptime_seconds {time.time() - self._started:.3f}"]
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'vaccination_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+            for endpoint, buckets in sorted(self._latency_buckets.items()):
+                count = sum(n for (e, _), n in self._requests.items() if e == endpoint)
+                for bound, n in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'vaccination_request_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {n}')
+                lines.append(f'vaccination_request_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+                lines.append(f'vaccination_request_seconds_sum{{endpoint="{endpoint}"}} {self._latency_sum[endpoint]:.6f}')
+                lines.append(f'vaccination_request_seconds_count{{endpoint="{endpoint}"}} {count}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"vaccination_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class MicroBatcher:
+    """
+    Coalesces items submitted within `window` seconds of each other (up to max_batch)
+    and hands them to `handler` as one list. handler returns one result per item; a
+    Future result is chained, so slow work does not hold up the next window, and an
+    Exception result fails only that item's request.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], List[Any]], metrics: Metrics,
+                 window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH):
+        self.name = name
+        self.handler = handler
+        self.metrics = metrics
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True).start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self.metrics.inc(f"{self.name}_batches_total")
+            self.metrics.inc(f"{self.name}_batched_items_total", len(batch))
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.handler(items)
+            except Exception as exc:  # one bad batch must not kill the batcher thread
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda done, future=future: _copy_outcome(done, future))
+                elif isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class SolveService:
+    """
+    Shared state behind the HTTP handler: a simulate batcher that evaluates each window
+    with one simulate_batch call per horizon, and an optimise batcher that de-duplicates
+    each window against an LRU solve cache and submits the misses to a process pool together.
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH,
+                 cache_size: int = DEFAULT_CACHE_SIZE, workers: Optional[int] = None):
+        self.metrics = Metrics()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[SolveKey, Future]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+        self.simulate_batcher = MicroBatcher("simulate", self._simulate_many, self.metrics, window, max_batch)
+        self.optimize_batcher = MicroBatcher("optimize", self._optimize_many, self.metrics, window, max_batch)
+
+    @staticmethod
+    def _simulate_group(items: List[Tuple[np.ndarray, ModelParams, ShockParams]]) -> List[Dict[str, Any]]:
+        F = np.array([f for f, _, _ in items])
+        outputs = simulate_batch(F, [params for _, params, _ in items], [shock for _, _, shock in items])
+        omega, p_values, conversions, beta_path, shock_active = outputs
+        return [
+            {
+                "omega": omega[row].tolist(),
+                "p_values": p_values[row].tolist(),
+                "conversions": conversions[row].tolist(),
+                "beta_path": beta_path[row].tolist(),
+                "shock_active": shock_active[row].tolist(),
+            }
+            for row in range(len(items))
+        ]
+
+    def _simulate_many(self, items: List[Tuple[np.ndarray, ModelParams, ShockParams]]) -> List[Any]:
+        results: List[Any] = [None] * len(items)
+
+        by_horizon: Dict[int, List[int]] = defaultdict(list)
+        for i, (_, params, _) in enumerate(items):
+            by_horizon[params.T].append(i)
+
+        for indices in by_horizon.values():
+            try:
+                group = self._simulate_group([items[i] for i in indices])
+            except Exception:
+                # Re-run the group item by item so only the failing items report an error.
+                group = []
+                for i in indices:
+                    try:
+                        group.extend(self._simulate_group([items[i]]))
+                    except Exception as exc:
+                        group.append(exc)
+            for i, result in zip(indices, group):
+                results[i] = result
+        return results
+
+    def _optimize_many(self, keys: List[SolveKey]) -> List[Any]:
+        # Cached entries are futures, so concurrent requests for a solve in flight share it.
+        futures: List[Any] = []
+        with self._cache_lock:
+            for key in keys:
+                try:
+                    futures.append(self._cached_solve(key))
+                except Exception as exc:
+                    futures.append(exc)
+        return futures
+
+    def _cached_solve(self, key: SolveKey) -> Future:
+        """Cache lookup or pool submission for one key; the caller holds _cache_lock."""
+        future = self._cache.get(key)
+        if future is not None:
+            self._cache.move_to_end(key)
+            self.metrics.inc("solve_cache_hits_total")
+            return future
+
+        future = self._pool.submit(_solve, *key)
+        future.add_done_callback(lambda done, key=key: self._evict_failed(key, done))
+        self._cache[key] = future
+        self.metrics.inc("solve_cache_misses_total")
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return future
+
+    def _evict_failed(self, key: SolveKey, future: Future) -> None:
+        if future.exception() is not None:
+            with self._cache_lock:
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+
+    def simulate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        params, shock = parse_scenario(payload)
+        f = parse_allocation(payload, params.T)
+        return self.simulate_batcher.submit((f, params, shock)).result()
+
+    def optimize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        params, shock = parse_scenario(payload)
+        return self.optimize_batcher.submit((params, shock)).result()
+
+    def results_table(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Results table for the given f, or for the optimal f if none is given."""
+        params, shock = parse_scenario(payload)
+        if "f" in payload:
+            f = parse_allocation(payload, params.T)
+            solution = None
+        else:
+            solution = self.optimize_batcher.submit((params, shock)).result()
+            f = np.asarray(solution["f"])
+
+        omega, p_values, conversions, beta_path, shock_active = simulate_trajectory(f, params, shock)
+        df = build_results_dataframe(
+            optimal_f=f,
+            omega=omega,
+            p_values=p_values,
+            conversions=conversions,
+            beta_path=beta_path,
+            shock_active=shock_active,
+            params=params,
+        )
+        response = {"rows": json.loads(df.to_json(orient="records"))}
+        if solution is not None:
+            response.update({k: solution[k] for k in ("total_qalys", "success", "message")})
+        return response
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+
+
+def _content_length(header: Optional[str]) -> int:
+    """Parses the Content-Length header, raising RequestError unless it is a non-negative integer."""
+    if header is None:
+        return 0
+    try:
+        length = int(header)
+    except ValueError:
+        raise RequestError(f"invalid Content-Length {header!r}") from None
+    if length < 0:
+        raise RequestError(f"invalid Content-Length {header!r}")
+    return length
+
+
+def make_handler(service: SolveService):
+    routes = {
+        "/simulate": service.simulate,
+        "/optimize": service.optimize,
+        "/results": service.results_table,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, obj: Any) -> None:
+            self._send(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, service.metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            route = routes.get(self.path)
+            if route is None:
+                status, body = 404, {"error": f"unknown path {self.path}"}
+            else:
+                try:
+                    length = _content_length(self.headers.get("Content-Length"))
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(payload, dict):
+                        raise RequestError("request body must be a JSON object")
+                    status, body = 200, route(payload)
+                except (RequestError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+                    status, body = 400, {"error": str(exc)}
+                except Exception as exc:
+                    status, body = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+            self._send_json(status, body)
+            service.metrics.observe(self.path if route else "unknown", status, time.perf_counter() - start)
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet under load; see /metrics instead
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # the default of 5 resets connections under concurrent load
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, window: float = DEFAULT_WINDOW,
+          max_batch: int = DEFAULT_MAX_BATCH, cache_size: int = DEFAULT_CACHE_SIZE,
+          workers: Optional[int] = None) -> None:
+    """Runs the service until interrupted."""
+    service = SolveService(window=window, max_batch=max_batch, cache_size=cache_size, workers=workers)
+    server = _Server((host, port), make_handler(service))
+    print(f"Serving on http://{host}:{port} (POST /simulate, /optimize, /results; GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,114 @@
+# vaccination_stochastic.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vaccination_engine import ModelParams, ShockParams, simulate_trajectory
+
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0)
+
+
+@dataclass(frozen=True)
+class StochasticResult:
+    omega: np.ndarray         # (R, T+1) integer vaccinated stock per replicate
+    conversions: np.ndarray   # (R, T) integer new vaccinations per replicate
+    p_values: np.ndarray      # length T, shared by all replicates
+    beta_path: np.ndarray
+    shock_active: np.ndarray
+
+
+def iter_stochastic_chunks(
+    f: np.ndarray,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    replicates: int = 1000,
+    seed: Optional[int] = None,
+    chunk_size: int = 10_000
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Streams replicate runs in chunks. Each period's conversions are drawn as
+    Binomial(unvaccinated, p_t) for every replicate in the chunk at once, so
+    memory is O(chunk_size * T) whatever the population size.
+
+    The same (seed, chunk_size) always reproduces the same replicates.
+
+    Yields:
+        omega: (chunk, T+1) integer vaccinated stock
+        conversions: (chunk, T) integer new vaccinations
+    """
+    _, p_values, *_ = simulate_trajectory(f, params, shock)
+    start = int(round(params.vaccinated_pop_start))
+
+    n_chunks = -(-replicates // chunk_size)
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    for i, stream in enumerate(streams):
+        rng = np.random.default_rng(stream)
+        size = min(chunk_size, replicates - i * chunk_size)
+
+        omega = np.empty((size, params.T + 1), dtype=np.int64)
+        conversions = np.empty((size, params.T), dtype=np.int64)
+        omega[:, 0] = start
+
+        for t in range(params.T):
+            conversions[:, t] = rng.binomial(params.N - omega[:, t], p_values[t])
+            omega[:, t + 1] = omega[:, t] + conversions[:, t]
+
+        yield omega, conversions
+
+
+def simulate_stochastic(
+    f: np.ndarray,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    replicates: int = 1000,
+    seed: Optional[int] = None,
+    chunk_size: int = 10_000
+) -> StochasticResult:
+    """
+    Stochastic counterpart of simulate_trajectory with whole people: R replicates of
+    binomial uptake under the same allocation f. Chunks are written into preallocated
+    (R, T) arrays.
+    """
+    _, p_values, _, beta_path, shock_active = simulate_trajectory(f, params, shock)
+
+    omega = np.empty((replicates, params.T + 1), dtype=np.int64)
+    conversions = np.empty((replicates, params.T), dtype=np.int64)
+
+    row = 0
+    for omega_chunk, conversions_chunk in iter_stochastic_chunks(f, params, shock, replicates, seed, chunk_size):
+        omega[row:row + len(omega_chunk)] = omega_chunk
+        conversions[row:row + len(conversions_chunk)] = conversions_chunk
+        row += len(omega_chunk)
+
+    return StochasticResult(omega=omega, conversions=conversions, p_values=p_values,
+                            beta_path=beta_path, shock_active=shock_active)
+
+
+def omega_percentiles(omega: np.ndarray, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> np.ndarray:
+    """
+    Returns:
+        bands: (len(percentiles), T+1) array of vaccinated stock percentiles across replicates
+    """
+    return np.percentile(omega, percentiles, axis=0)
+
+
+def add_omega_bands(
+    df: pd.DataFrame,
+    bands: np.ndarray,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> pd.DataFrame:
+    """
+    Adds percentile columns for the stochastic vaccinated stock next to
+    "Total vaccinated (start of t)" in a build_results_dataframe table.
+    """
+    df = df.copy()
+    position = df.columns.get_loc("Total vaccinated (start of t)") + 1
+    for band, pct in zip(bands, percentiles):
+        df.insert(position, f"Total vaccinated P{pct:g} (start of t)", band[0:len(df)].astype(float))
+        position += 1
+    return df
@@ -0,0 +1,214 @@
+# vaccination_store.py
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vaccination_engine import ModelParams, ShockParams, build_results_dataframe
+
+# One row per scenario. Trajectories are float32 (relative error ~6e-8, exact for whole
+# people up to 16.7M) and shock_active is bit-packed; parameters stay full precision.
+SCENARIO_DTYPE = np.dtype([
+    ("N", np.int64),
+    ("T", np.int32),
+    ("beta", np.float64),
+    ("B", np.float64),
+    ("vaccinated_pop_start", np.float64),
+    ("x", np.float64),
+    ("rho", np.float64),
+    ("shock_enabled", np.bool_),
+    ("shock_start_t", np.int32),
+    ("shock_beta_reduction_pct", np.float64),
+    ("shock_duration", np.int32),
+])
+
+TRAJECTORY_COLUMNS = ("optimal_f", "omega", "p_values", "conversions", "beta_path")
+
+
+def _column_shapes(T_max: int, capacity: int) -> Dict[str, Tuple[Tuple[int, ...], np.dtype]]:
+    shapes = {name: ((capacity, T_max), np.dtype(np.float32)) for name in TRAJECTORY_COLUMNS}
+    shapes["omega"] = ((capacity, T_max + 1), np.dtype(np.float32))
+    shapes["shock_active"] = ((capacity, -(-T_max // 8)), np.dtype(np.uint8))
+    shapes["scenarios"] = ((capacity,), SCENARIO_DTYPE)
+    return shapes
+
+
+def create_trajectory_store(path: str, T_max: int, capacity: int = 1024) -> "TrajectoryStore":
+    """
+    Creates an empty store in directory `path` with room for `capacity` scenarios of
+    up to T_max periods, and returns it opened for appending.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, (shape, dtype) in _column_shapes(T_max, capacity).items():
+        np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape).flush()
+    _write_meta(path, {"version": 1, "T_max": T_max, "capacity": capacity, "count": 0})
+    return TrajectoryStore(path, mode="r+")
+
+
+def _write_meta(path: str, meta: Dict) -> None:
+    # Write-then-rename so concurrent readers never see a half-written count.
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+class TrajectoryStore:
+    """
+    Columnar, memory-mapped store of simulated trajectories. Each column is a
+    preallocated .npy file; rows become visible to readers once flush() publishes
+    the new count, so a sweep can be read while it is still appending.
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.path = path
+        self.mode = mode
+        self._open()
+        self.count = self.published
+
+    def _open(self) -> None:
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        self.T_max = int(meta["T_max"])
+        self.capacity = int(meta["capacity"])
+        self.published = int(meta["count"])   # rows visible to readers; count also includes unflushed appends
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=self.mode)
+            for name in _column_shapes(self.T_max, self.capacity)
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def refresh(self) -> None:
+        """For readers: picks up rows (and growth) published by an appending writer."""
+        self._open()
+        self.count = self.published
+
+    def flush(self) -> None:
+        """Flushes appended rows to disk and publishes the new count."""
+        if self.mode == "r":
+            return
+        for column in self.columns.values():
+            column.flush()
+        _write_meta(self.path, {"version": 1, "T_max": self.T_max, "capacity": self.capacity, "count": self.count})
+        self.published = self.count
+
+    def _reserve(self, n: int) -> None:
+        if self.count + n <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, self.count + n)
+        for name, (shape, dtype) in _column_shapes(self.T_max, capacity).items():
+            tmp = os.path.join(self.path, f"{name}.npy.tmp")
+            grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            grown[:self.count] = self.columns[name][:self.count]
+            grown.flush()
+            del grown
+            self.columns[name] = None   # release the old mapping before replacing its file
+            os.replace(tmp, os.path.join(self.path, f"{name}.npy"))
+        self.capacity = capacity
+        # Publish the new capacity only; unflushed rows stay invisible until flush().
+        _write_meta(self.path, {"version": 1, "T_max": self.T_max, "capacity": self.capacity,
+                                "count": self.published})
+        self._open()
+
+    def append_batch(
+        self,
+        params_list: Sequence[ModelParams],
+        shocks: Sequence[Optional[ShockParams]],
+        optimal_f: np.ndarray,
+        omega: np.ndarray,
+        p_values: np.ndarray,
+        conversions: np.ndarray,
+        beta_path: np.ndarray,
+        shock_active: np.ndarray
+    ) -> slice:
+        """
+        Appends scenarios sharing the same T (e.g. one simulate_batch call). Arrays have a
+        leading batch axis. Rows are not visible to readers until flush().
+
+        Returns:
+            rows: slice of the new row indices
+        """
+        if self.mode == "r":
+            raise ValueError("store is open read-only")
+        n = len(params_list)
+        T = params_list[0].T
+        if any(p.T != T for p in params_list) or T > self.T_max:
+            raise ValueError(f"append_batch requires every scenario to share one T <= {self.T_max}")
+
+        self._reserve(n)
+        rows = slice(self.count, self.count + n)
+
+        self.columns["optimal_f"][rows, :T] = np.asarray(optimal_f).reshape(n, T)
+        self.columns["omega"][rows, :T + 1] = np.asarray(omega).reshape(n, T + 1)
+        self.columns["p_values"][rows, :T] = np.asarray(p_values).reshape(n, T)
+        self.columns["conversions"][rows, :T] = np.asarray(conversions).reshape(n, T)
+        self.columns["beta_path"][rows, :T] = np.asarray(beta_path).reshape(n, T)
+
+        packed = np.packbits(np.asarray(shock_active, dtype=bool).reshape(n, T), axis=1)
+        self.columns["shock_active"][rows, :packed.shape[1]] = packed
+
+        scenarios = self.columns["scenarios"]
+        for row, params, shock in zip(range(rows.start, rows.stop), params_list, shocks):
+            shock = shock or ShockParams(enabled=False)
+            scenarios[row] = (params.N, params.T, params.beta, params.B, params.vaccinated_pop_start,
+                              params.x, params.rho, shock.enabled, shock.start_t,
+                              shock.beta_reduction_pct, shock.duration)
+
+        self.count += n
+        return rows
+
+    def append(
+        self,
+        params: ModelParams,
+        shock: Optional[ShockParams],
+        optimal_f: np.ndarray,
+        omega: np.ndarray,
+        p_values: np.ndarray,
+        conversions: np.ndarray,
+        beta_path: np.ndarray,
+        shock_active: np.ndarray
+    ) -> int:
+        """Appends one scenario (simulate_trajectory outputs) and returns its row index."""
+        arrays = [np.asarray(a)[None] for a in (optimal_f, omega, p_values, conversions, beta_path, shock_active)]
+        rows = self.append_batch([params], [shock], *arrays)
+        return rows.start
+
+    def scenario_params(self, i: int) -> Tuple[ModelParams, ShockParams]:
+        row = self.columns["scenarios"][self._check_row(i)]
+        params = ModelParams(N=int(row["N"]), T=int(row["T"]), beta=float(row["beta"]), B=float(row["B"]),
+                             vaccinated_pop_start=float(row["vaccinated_pop_start"]),
+                             x=float(row["x"]), rho=float(row["rho"]))
+        shock = ShockParams(enabled=bool(row["shock_enabled"]), start_t=int(row["shock_start_t"]),
+                            beta_reduction_pct=float(row["shock_beta_reduction_pct"]),
+                            duration=int(row["shock_duration"]))
+        return params, shock
+
+    def scenario(self, i: int) -> Dict[str, np.ndarray]:
+        """
+        Zero-copy float32 views of one scenario's trajectories. shock_active is unpacked
+        from bits, so it is the only copied column.
+        """
+        i = self._check_row(i)
+        T = int(self.columns["scenarios"][i]["T"])
+        views = {name: self.columns[name][i, :T] for name in TRAJECTORY_COLUMNS}
+        views["omega"] = self.columns["omega"][i, :T + 1]
+        views["shock_active"] = np.unpackbits(self.columns["shock_active"][i], count=T).astype(bool)
+        return views
+
+    def results_dataframe(self, i: int) -> pd.DataFrame:
+        """build_results_dataframe for stored scenario i."""
+        params, _ = self.scenario_params(i)
+        return build_results_dataframe(params=params, **self.scenario(i))
+
+    def _check_row(self, i: int) -> int:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"scenario {i} out of range for store with {self.count} scenarios")
+        return i
@@ -0,0 +1,353 @@
+# vaccination_surrogate.py
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vaccination_engine import (
+    ModelParams, ShockParams,
+    build_beta_path,
+    optimize_budget_allocation,
+    simulate_trajectory,
+)
+
+# The unvaccinated stock evolves as U_{t+1} = U_t * exp(-beta_t * B**rho * f_t**rho), so the
+# optimal f depends on beta and B only through k = beta * B**rho, and not on N, x or the
+# initial stock. The table is therefore solved once on a canonical problem (N=1, B=1, x=1)
+# over (k, rho, shock strength), for each discrete (T, shock start, shock duration) key.
+#
+# Tabulating every shock window is only practical for short horizons (T=60 alone has 1,830
+# windows), so a shock without its own key starts from the no-shock entry for the same T and
+# is adapted to the shocked beta path with a few fixed-point steps on the optimality
+# conditions. The duality-gap bound then decides whether the result is good enough to show.
+
+DEFAULT_TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "surrogate_table")
+DEFAULT_TOLERANCE = 1e-2
+
+# k = beta * B**rho spans [0, 100] over the UI ranges (beta <= 1, B <= 100).
+DEFAULT_K_GRID = np.geomspace(1e-4, 100.0, 19)
+DEFAULT_RHO_GRID = np.linspace(0.01, 1.0, 12)
+DEFAULT_REDUCTION_GRID = np.linspace(0.0, 1.0, 6)
+
+ADAPT_ITERATIONS = 30
+ADAPT_STEP = 0.5
+
+TableKey = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class SurrogateAnswer:
+    optimal_f: np.ndarray
+    total_qalys: float
+    error_estimate: float   # bound on relative shortfall in QALYs gained through communication
+    source: str             # "surrogate" or "solve"
+
+
+def canonical_key(params: ModelParams, shock: Optional[ShockParams] = None) -> TableKey:
+    """
+    Maps (T, shock) to the discrete table key (T, start_t, duration).
+    Shocks that leave beta unchanged map to (T, 0, 0).
+    """
+    shock = shock or ShockParams(enabled=False)
+    T = params.T
+    start = max(shock.start_t, 1)
+    reduction = float(np.clip(shock.beta_reduction_pct, 0.0, 1.0))
+
+    if not shock.enabled or shock.duration <= 0 or start > T or reduction == 0.0:
+        return (T, 0, 0)
+
+    return (T, start, min(shock.duration, T - start + 1))
+
+
+def _canonical_problem(key: TableKey, k: float, rho: float, reduction: float) -> Tuple[ModelParams, ShockParams]:
+    T, start, duration = key
+    params = ModelParams(N=1, T=T, beta=k, B=1.0, vaccinated_pop_start=0.0, x=1.0, rho=rho)
+    shock = ShockParams(enabled=duration > 0, start_t=max(start, 1),
+                        beta_reduction_pct=reduction, duration=duration)
+    return params, shock
+
+
+def _project_to_simplex(f: np.ndarray) -> np.ndarray:
+    f = np.clip(np.asarray(f, dtype=float), 0.0, None)
+    total = f.sum()
+    return f / total if total > 0 else np.ones(len(f)) / len(f)
+
+
+def _gained_person_periods(f: np.ndarray, key: TableKey, k: float, rho: float, reduction: float) -> float:
+    """Vaccinated person-periods (per initially unvaccinated person) generated by f."""
+    params, shock = _canonical_problem(key, k, rho, reduction)
+    omega, *_ = simulate_trajectory(f, params, shock)
+    return float(np.sum(omega[0:params.T]))
+
+
+def build_surrogate_table(
+    out_dir: str,
+    T_values: Sequence[int],
+    include_shocks: bool = False,
+    k_grid: np.ndarray = DEFAULT_K_GRID,
+    rho_grid: np.ndarray = DEFAULT_RHO_GRID,
+    reduction_grid: np.ndarray = DEFAULT_REDUCTION_GRID,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Pre-solves the canonical problem over the grid and writes the table to out_dir:
+        index.json: grid axes and the list of (T, start_t, duration) keys
+        f.npy:      float32 optimal f, shape (keys, k, rho, reduction, T_max), zero-padded
+        value.npy:  float32 optimal gained person-periods, shape (keys, k, rho, reduction)
+    """
+    keys: List[TableKey] = []
+    for T in sorted(set(int(T) for T in T_values)):
+        keys.append((T, 0, 0))
+        if include_shocks:
+            for start in range(1, T + 1):
+                for duration in range(1, T - start + 2):
+                    keys.append((T, start, duration))
+
+    T_max = max(key[0] for key in keys)
+    shape = (len(keys), len(k_grid), len(rho_grid), len(reduction_grid))
+
+    os.makedirs(out_dir, exist_ok=True)
+    f_table = np.lib.format.open_memmap(os.path.join(out_dir, "f.npy"), mode="w+",
+                                        dtype=np.float32, shape=shape + (T_max,))
+    value_table = np.lib.format.open_memmap(os.path.join(out_dir, "value.npy"), mode="w+",
+                                            dtype=np.float32, shape=shape)
+
+    for i, key in enumerate(keys):
+        T, _, duration = key
+        # Without a shock the reduction axis is irrelevant: solve once and broadcast.
+        n_red = len(reduction_grid) if duration > 0 else 1
+
+        for ir, rho in enumerate(rho_grid):
+            for ired in range(n_red):
+                guess = None
+                for ik, k in enumerate(k_grid):
+                    params, shock = _canonical_problem(key, k, rho, reduction_grid[ired])
+                    result = optimize_budget_allocation(params, shock, initial_guess=guess)
+                    f = _project_to_simplex(result.x)
+                    guess = f
+
+                    f_table[i, ik, ir, ired, :T] = f
+                    value_table[i, ik, ir, ired] = _gained_person_periods(
+                        f, key, k, rho, reduction_grid[ired])
+
+        if n_red == 1:
+            f_table[i, :, :, 1:, :] = f_table[i, :, :, :1, :]
+            value_table[i, :, :, 1:] = value_table[i, :, :, :1]
+
+        if progress is not None:
+            progress(i + 1, len(keys))
+
+    f_table.flush()
+    value_table.flush()
+
+    index = {
+        "version": 1,
+        "T_max": T_max,
+        "k_grid": [float(v) for v in k_grid],
+        "rho_grid": [float(v) for v in rho_grid],
+        "reduction_grid": [float(v) for v in reduction_grid],
+        "keys": [list(key) for key in keys],
+    }
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as fh:
+        json.dump(index, fh)
+
+
+def _bracket(grid: np.ndarray, value: float) -> List[Tuple[int, float]]:
+    """Returns the (index, weight) pairs for linear interpolation, clamped to the grid."""
+    if len(grid) == 1:
+        return [(0, 1.0)]
+    value = float(np.clip(value, grid[0], grid[-1]))
+    hi = int(np.clip(np.searchsorted(grid, value, side="right"), 1, len(grid) - 1))
+    lo = hi - 1
+    w = (value - grid[lo]) / (grid[hi] - grid[lo])
+    return [(lo, 1.0 - w), (hi, w)]
+
+
+class SurrogateTable:
+    """
+    Read-only view of a table written by build_surrogate_table. The arrays are
+    memory-mapped, so loading is cheap and only the touched cells are read.
+    """
+
+    def __init__(self, table_dir: str = DEFAULT_TABLE_DIR):
+        with open(os.path.join(table_dir, "index.json"), encoding="utf-8") as fh:
+            index = json.load(fh)
+
+        self.T_max = int(index["T_max"])
+        self.log_k_grid = np.log(np.asarray(index["k_grid"], dtype=float))
+        self.rho_grid = np.asarray(index["rho_grid"], dtype=float)
+        self.reduction_grid = np.asarray(index["reduction_grid"], dtype=float)
+        self.rows: Dict[TableKey, int] = {tuple(key): i for i, key in enumerate(index["keys"])}
+
+        self.f_table = np.load(os.path.join(table_dir, "f.npy"), mmap_mode="r")
+        self.value_table = np.load(os.path.join(table_dir, "value.npy"), mmap_mode="r")
+
+    def covers(self, params: ModelParams, shock: Optional[ShockParams] = None) -> bool:
+        """True if the table can answer: an exact key, or the no-shock key for the same T."""
+        return canonical_key(params, shock) in self.rows or (params.T, 0, 0) in self.rows
+
+    def lookup(self, params: ModelParams, shock: Optional[ShockParams] = None) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Multilinear interpolation over (log k, rho, shock strength).
+
+        Returns:
+            (f, gained person-periods per unvaccinated person), or None if the key is not tabulated
+        """
+        shock = shock or ShockParams(enabled=False)
+        key = canonical_key(params, shock)
+        row = self.rows.get(key)
+        if row is None:
+            return None
+
+        k = params.beta * params.B ** params.rho
+        log_k = np.log(max(k, float(np.exp(self.log_k_grid[0]))))
+        reduction = float(np.clip(shock.beta_reduction_pct, 0.0, 1.0)) if key[2] > 0 else 0.0
+
+        T = params.T
+        f = np.zeros(T)
+        value = 0.0
+        for ik, wk in _bracket(self.log_k_grid, log_k):
+            for ir, wr in _bracket(self.rho_grid, params.rho):
+                for ired, wred in _bracket(self.reduction_grid, reduction):
+                    w = wk * wr * wred
+                    if w == 0.0:
+                        continue
+                    f += w * self.f_table[row, ik, ir, ired, :T]
+                    value += w * float(self.value_table[row, ik, ir, ired])
+
+        return _project_to_simplex(f), value
+
+
+def load_surrogate_table(table_dir: str = DEFAULT_TABLE_DIR) -> Optional[SurrogateTable]:
+    """Returns the table, or None if it has not been built."""
+    if not os.path.exists(os.path.join(table_dir, "index.json")):
+        return None
+    return SurrogateTable(table_dir)
+
+
+def _k_path(params: ModelParams, shock: Optional[ShockParams]) -> np.ndarray:
+    beta_path, _ = build_beta_path(params, shock or ShockParams(enabled=False))
+    return beta_path * params.B ** params.rho
+
+
+def _remaining_and_tail(f: np.ndarray, k_path: np.ndarray, rho: float) -> Tuple[np.ndarray, np.ndarray]:
+    c = np.concatenate(([0.0], np.cumsum(k_path * f ** rho)[:-1]))
+    remaining = np.exp(-c)                                  # unvaccinated share at start of t
+    tail = np.cumsum(remaining[::-1])[::-1] - remaining     # sum of remaining over t > s
+    return remaining, tail
+
+
+def adapt_to_shock(
+    f: np.ndarray,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    iterations: int = ADAPT_ITERATIONS,
+    step: float = ADAPT_STEP
+) -> np.ndarray:
+    """
+    Damped fixed-point iteration on the optimality condition f_t ~ (k_t * tail_t)**(1 / (1 - rho)),
+    starting from f. Each step is O(T), so an allocation tabulated without a shock can be
+    moved to the optimum for a shocked beta path in about a millisecond.
+    """
+    f = _project_to_simplex(np.clip(f, 1e-12, None))
+    if params.rho >= 1.0:
+        return f   # linear returns: the optimum is a corner and the condition has no interior solution
+
+    k_path = _k_path(params, shock)
+    for _ in range(iterations):
+        _, tail = _remaining_and_tail(f, k_path, params.rho)
+        with np.errstate(divide="ignore"):
+            log_target = np.log(k_path * tail) / (1.0 - params.rho)
+        if not np.isfinite(np.max(log_target)):
+            break   # every period is worthless (e.g. no budget): nothing to move towards
+        # Damped in log space; exp(-inf) = 0 for periods with no remaining value.
+        log_f = (1.0 - step) * np.log(f) + step * (log_target - np.max(log_target))
+        f = _project_to_simplex(np.clip(np.exp(log_f - np.max(log_f)), 1e-12, None))
+    return f
+
+
+def suboptimality_bound(f: np.ndarray, params: ModelParams, shock: Optional[ShockParams] = None) -> float:
+    """
+    Frank-Wolfe duality gap of f, relative to the person-periods it gains. With rho <= 1 the
+    objective is concave on the simplex, so this bounds the relative shortfall from the optimum.
+    """
+    k_path = _k_path(params, shock)
+    f = np.asarray(f, dtype=float)
+    remaining, tail = _remaining_and_tail(f, k_path, params.rho)
+
+    scale = k_path * params.rho * tail
+    # A zero share in a period that still has value gives an infinite marginal (and gap).
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal = np.where(scale > 0, scale * f ** (params.rho - 1.0), 0.0)
+        gap = float(np.max(marginal) - marginal @ f)
+
+    gained = float(np.sum(1.0 - remaining))
+    if not np.isfinite(gap):
+        return float("inf")
+    return max(gap, 0.0) / gained if gained > 0 else 0.0
+
+
+def surrogate_answer(
+    table: SurrogateTable,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None
+) -> Optional[SurrogateAnswer]:
+    """
+    Interpolated answer with an error estimate. total_qalys is the true value of the
+    interpolated f; the error estimate is its suboptimality_bound. Shocks without their
+    own key start from the no-shock entry and keep adapt_to_shock's result if it tightens
+    the bound. Returns None if the table has no entry for T.
+    """
+    shock = shock or ShockParams(enabled=False)
+    hit = table.lookup(params, shock)
+    if hit is not None:
+        f, _ = hit
+        bound = suboptimality_bound(f, params, shock)
+    else:
+        hit = table.lookup(params)
+        if hit is None:
+            return None
+        f, _ = hit
+        bound = suboptimality_bound(f, params, shock)
+        adapted = adapt_to_shock(f, params, shock)
+        adapted_bound = suboptimality_bound(adapted, params, shock)
+        if adapted_bound < bound:
+            f, bound = adapted, adapted_bound
+
+    omega, *_ = simulate_trajectory(f, params, shock)
+    total_qalys = float(np.sum(omega[0:params.T]) * params.x)
+
+    return SurrogateAnswer(optimal_f=f, total_qalys=total_qalys, error_estimate=bound, source="surrogate")
+
+
+def solve_exact(params: ModelParams, shock: Optional[ShockParams] = None) -> SurrogateAnswer:
+    """
+    Full optimisation wrapped as a SurrogateAnswer.
+    Raises RuntimeError if the optimiser does not converge.
+    """
+    result = optimize_budget_allocation(params=params, shock=shock)
+    if not result.success:
+        raise RuntimeError(f"Optimisation failed: {result.message}")
+    return SurrogateAnswer(optimal_f=result.x, total_qalys=float(-result.fun),
+                           error_estimate=0.0, source="solve")
+
+
+def solve_with_surrogate(
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    table: Optional[SurrogateTable] = None,
+    tol: float = DEFAULT_TOLERANCE
+) -> SurrogateAnswer:
+    """
+    Returns the surrogate answer if its error estimate is within tol,
+    otherwise falls back to a full optimisation.
+    """
+    if table is not None:
+        answer = surrogate_answer(table, params, shock)
+        if answer is not None and answer.error_estimate <= tol:
+            return answer
+    return solve_exact(params, shock)
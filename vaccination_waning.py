@@ -0,0 +1,218 @@
+# vaccination_waning.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.optimize import minimize
+
+from vaccination_engine import ModelParams, ShockParams, build_beta_path
+
+
+@dataclass(frozen=True)
+class WaningParams:
+    waning_rate: float = 0.0                                  # per-period hazard of losing protection
+    protection_survival: Optional[Tuple[float, ...]] = None   # P(still protected) by age; overrides waning_rate
+    n_ages: int = 12                                          # cohort ages tracked; the last one is open-ended
+    booster_B: float = 0.0                                    # booster budget per capita
+    booster_min_age: int = 1                                  # youngest cohort age eligible for a booster
+
+
+@dataclass(frozen=True)
+class WaningTrajectory:
+    omega: np.ndarray          # length T+1 protected stock (sum over cohort ages)
+    cohorts: np.ndarray        # (T+1, A) protected stock by age since last dose
+    susceptible: np.ndarray    # length T+1 unprotected stock (never vaccinated or waned)
+    p_values: np.ndarray       # length T primary uptake probability
+    q_values: np.ndarray       # length T booster uptake probability
+    conversions: np.ndarray    # length T primary vaccinations
+    boosters: np.ndarray       # length T boosters given
+    waned: np.ndarray          # length T people losing protection
+    beta_path: np.ndarray
+    shock_active: np.ndarray
+
+
+def retention_profile(waning: WaningParams) -> np.ndarray:
+    """
+    Returns:
+        retain: length A array, retain[a] = share of age-a cohort still protected one period later
+    """
+    if waning.protection_survival is None:
+        return np.full(waning.n_ages, float(np.exp(-waning.waning_rate)))
+
+    survival = np.asarray(waning.protection_survival, dtype=float)
+    retain = np.ones(len(survival))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(survival[:-1] > 0, survival[1:] / survival[:-1], 0.0)
+    retain[:-1] = ratio
+    retain[-1] = ratio[-1] if len(ratio) else 1.0
+    return np.clip(retain, 0.0, 1.0)
+
+
+def _uptake(share: np.ndarray, budget: float, beta_path: np.ndarray, rho: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Uptake probabilities 1 - exp(-beta_t (budget * share_t)^rho) and their derivative in share_t."""
+    share = np.maximum(np.asarray(share, dtype=float), 0.0)
+    effort = beta_path * (budget * share) ** rho
+    prob = 1.0 - np.exp(-effort)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dprob = np.where(share > 0, np.exp(-effort) * rho * effort / share, np.inf)
+    dprob[beta_path * budget == 0] = 0.0
+    return prob, dprob
+
+
+def simulate_waning(
+    f: np.ndarray,
+    g: np.ndarray,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    waning: Optional[WaningParams] = None
+) -> WaningTrajectory:
+    """
+    Simulates the model with waning immunity and a booster channel.
+
+    f allocates the primary budget B and g the booster budget booster_B over time. Each
+    period, new vaccinations and boosters enter the age-0 cohort of the next period, every
+    cohort ages by one (the last age is open-ended), and a share 1 - retain[a] of each
+    cohort wanes back to susceptible. With no waning and no booster budget this matches
+    simulate_trajectory.
+    """
+    shock = shock or ShockParams(enabled=False)
+    waning = waning or WaningParams()
+    beta_path, shock_active = build_beta_path(params, shock)
+
+    retain = retention_profile(waning)
+    A = len(retain)
+    eligible = np.arange(A) >= waning.booster_min_age
+
+    p_values, _ = _uptake(f, params.B, beta_path, params.rho)
+    q_values, _ = _uptake(g, waning.booster_B, beta_path, params.rho)
+
+    cohorts = np.zeros((params.T + 1, A))
+    susceptible = np.zeros(params.T + 1)
+    cohorts[0, 0] = params.vaccinated_pop_start
+    susceptible[0] = params.N - params.vaccinated_pop_start
+
+    conversions = np.zeros(params.T)
+    boosters = np.zeros(params.T)
+    waned = np.zeros(params.T)
+
+    for t in range(params.T):
+        V, S = cohorts[t], susceptible[t]
+
+        boosted = q_values[t] * eligible * V
+        remaining = V - boosted
+        new = p_values[t] * S
+
+        shifted = retain * remaining
+        cohorts[t + 1, 1:] = shifted[:-1]
+        cohorts[t + 1, -1] += shifted[-1]
+        cohorts[t + 1, 0] += new + boosted.sum()
+
+        conversions[t] = new
+        boosters[t] = boosted.sum()
+        waned[t] = remaining.sum() - shifted.sum()
+        susceptible[t + 1] = S - new + waned[t]
+
+    return WaningTrajectory(
+        omega=cohorts.sum(axis=1), cohorts=cohorts, susceptible=susceptible,
+        p_values=p_values, q_values=q_values, conversions=conversions,
+        boosters=boosters, waned=waned, beta_path=beta_path, shock_active=shock_active,
+    )
+
+
+def waning_objective_and_gradient(
+    z: np.ndarray,
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    waning: Optional[WaningParams] = None
+) -> Tuple[float, np.ndarray]:
+    """
+    Negative total QALYs for z = [f, g] and its gradient, from one forward simulation and
+    one backward (adjoint) pass over the cohort array. Cost is O(T * A).
+    """
+    waning = waning or WaningParams()
+    T = params.T
+    f, g = z[:T], z[T:]
+
+    traj = simulate_waning(f, g, params, shock, waning)
+    retain = retention_profile(waning)
+    eligible = np.arange(len(retain)) >= waning.booster_min_age
+
+    _, dp = _uptake(f, params.B, traj.beta_path, params.rho)
+    _, dq = _uptake(g, waning.booster_B, traj.beta_path, params.rho)
+
+    # Adjoints of the state at the start of t+1; the final stock earns no QALYs.
+    lam_V = np.zeros(len(retain))
+    lam_S = 0.0
+    grad_p = np.zeros(T)
+    grad_q = np.zeros(T)
+
+    for t in reversed(range(T)):
+        V, S = traj.cohorts[t], traj.susceptible[t]
+        p, q = traj.p_values[t], traj.q_values[t]
+
+        lam_shift = np.append(lam_V[1:], lam_V[-1])
+        lam_remaining = retain * lam_shift + (1.0 - retain) * lam_S
+        entry_gain = lam_V[0]
+
+        grad_p[t] = S * (entry_gain - lam_S)
+        grad_q[t] = np.sum(eligible * V * (entry_gain - lam_remaining))
+
+        lam_V = params.x + lam_remaining + q * eligible * (entry_gain - lam_remaining)
+        lam_S = lam_S + p * (entry_gain - lam_S)
+
+    total_qalys = float(np.sum(traj.omega[0:T]) * params.x)
+
+    # Zero shares whose adjoint is zero contribute nothing (avoids 0 * inf).
+    with np.errstate(invalid="ignore"):
+        grad_f = np.where(grad_p == 0, 0.0, grad_p * dp)
+        grad_g = np.where(grad_q == 0, 0.0, grad_q * dq)
+
+    return -total_qalys, -np.concatenate([grad_f, grad_g])
+
+
+def optimize_waning_allocation(
+    params: ModelParams,
+    shock: Optional[ShockParams] = None,
+    waning: Optional[WaningParams] = None,
+    initial_guess: Optional[np.ndarray] = None
+):
+    """
+    Solves for optimal primary (f) and booster (g) allocations, each on its own simplex,
+    using the adjoint gradient.
+
+    Returns:
+        result: scipy.optimize.OptimizeResult with x = [f, g] (see split_allocation)
+    """
+    T = params.T
+    shock = shock or ShockParams(enabled=False)
+    waning = waning or WaningParams()
+
+    if initial_guess is None:
+        initial_guess = np.ones(2 * T) / T
+
+    primary = np.concatenate([np.ones(T), np.zeros(T)])
+    booster = np.concatenate([np.zeros(T), np.ones(T)])
+    constraints = (
+        {'type': 'eq', 'fun': lambda z: primary @ z - 1.0, 'jac': lambda z: primary},
+        {'type': 'eq', 'fun': lambda z: booster @ z - 1.0, 'jac': lambda z: booster},
+    )
+    # A tiny lower bound keeps the marginal effect of a share finite when rho < 1.
+    bounds = [(1e-9, 1.0) for _ in range(2 * T)]
+
+    result = minimize(
+        fun=waning_objective_and_gradient,
+        x0=initial_guess,
+        args=(params, shock, waning),
+        jac=True,
+        method="SLSQP",
+        bounds=bounds,
+        constraints=constraints
+    )
+    return result
+
+
+def split_allocation(z: np.ndarray, T: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits an optimize_waning_allocation solution into (f, g)."""
+    return z[:T], z[T:]